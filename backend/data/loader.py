@@ -113,10 +113,12 @@ def compute_rfm(df: pd.DataFrame | None = None) -> pd.DataFrame:
     return rfm
 
 
-def get_dataset_stats() -> dict:
+def get_dataset_stats(df: pd.DataFrame | None = None, rfm: pd.DataFrame | None = None) -> dict:
     """Return summary statistics about the loaded dataset."""
-    df = load_raw()
-    rfm = compute_rfm(df)
+    if df is None:
+        df = load_raw()
+    if rfm is None:
+        rfm = compute_rfm(df)
     return {
         "total_transactions": int(len(df)),
         "total_customers": int(rfm["CustomerID"].nunique()),
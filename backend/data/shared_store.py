@@ -0,0 +1,279 @@
+"""
+Shared, memory-mapped copy of the dataset for multi-worker deployments.
+
+The first worker to start publishes the cleaned transactions, the RFM table,
+the standard-scaled feature matrix and the encoded basket matrix as .npy files
+under a versioned directory. Every worker then attaches with np.load(mmap_mode="r"),
+so all of them share the same page-cache pages instead of holding private copies.
+
+Layout of STORE_DIR:
+    CURRENT               -> name of the live version (swapped with os.replace)
+    versions/<version>/   -> manifest.json + one .npy file per column / matrix
+    .lock                 -> serialises publishing between workers
+
+Refresh the published data with `python -m data.shared_store`; running workers
+pick the new version up on their next request.
+"""
+import hashlib
+import json
+import os
+import shutil
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import StandardScaler
+
+from data.loader import CACHE_PATH, RFM_CACHE_PATH, load_raw, compute_rfm
+from ml.clustering import FEATURE_COLS as CLUSTERING_COLS
+from ml.dimensionality import FEATURE_COLS as DIMENSIONALITY_COLS
+from ml.personas import FEATURE_COLS as PERSONA_COLS
+from ml.market_basket import encode_basket
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process dev server, no locking needed
+    fcntl = None
+
+STORE_DIR = os.environ.get("DATASET_STORE_DIR", os.path.join(os.path.dirname(__file__), "shared"))
+VERSIONS_DIR = os.path.join(STORE_DIR, "versions")
+CURRENT_PATH = os.path.join(STORE_DIR, "CURRENT")
+LOCK_PATH = os.path.join(STORE_DIR, ".lock")
+KEEP_VERSIONS = 2  # live version + the one before it, for requests still in flight
+
+# Bump whenever the published files change for the same source CSVs: the on-disk
+# layout (_write_frame / _write_matrix) or how the derived arrays are built
+# (encode_basket, scaling). Part of every version handle, so a deploy republishes.
+STORE_FORMAT_VERSION = 2
+
+# Union of every feature set the ML modules scale; StandardScaler works per
+# column, so each module can slice its own columns out of this one matrix.
+SCALED_COLS = list(dict.fromkeys(CLUSTERING_COLS + DIMENSIONALITY_COLS + PERSONA_COLS))
+
+
+@dataclass(frozen=True)
+class Dataset:
+    """One immutable, attached version of the published data."""
+    version: str
+    raw: pd.DataFrame
+    rfm: pd.DataFrame
+    scaled: pd.DataFrame
+    basket: pd.DataFrame
+
+
+_attached: Dataset | None = None
+_attach_lock = threading.Lock()
+
+
+# ─────────────────────────────
+# Locking / versioning
+# ─────────────────────────────
+@contextmanager
+def _publish_lock():
+    os.makedirs(STORE_DIR, exist_ok=True)
+    with open(LOCK_PATH, "a") as fh:
+        if fcntl is not None:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+def source_fingerprint() -> str:
+    """Version handle derived from the store format and the source caches (path, size, mtime)."""
+    h = hashlib.sha1()
+    h.update(f"format:{STORE_FORMAT_VERSION}:{','.join(SCALED_COLS)};".encode())
+    for path in (CACHE_PATH, RFM_CACHE_PATH):
+        if os.path.exists(path):
+            st = os.stat(path)
+            h.update(f"{os.path.basename(path)}:{st.st_size}:{st.st_mtime_ns};".encode())
+    return h.hexdigest()[:16]
+
+
+def current_version() -> str | None:
+    """Name of the live version, or None if nothing has been published yet."""
+    try:
+        with open(CURRENT_PATH) as fh:
+            return fh.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def _is_published(version: str | None) -> bool:
+    return version is not None and os.path.exists(os.path.join(VERSIONS_DIR, version, "manifest.json"))
+
+
+# ─────────────────────────────
+# Writing
+# ─────────────────────────────
+def _is_text(col: pd.Series) -> bool:
+    return col.dtype == object or pd.api.types.is_string_dtype(col.dtype) or isinstance(col.dtype, pd.CategoricalDtype)
+
+
+def _save_labels(path: str, values) -> None:
+    np.save(path, np.asarray([str(v) for v in values], dtype=str))
+
+
+def _write_frame(path: str, prefix: str, df: pd.DataFrame) -> dict:
+    """Store each column as its own .npy; text columns become categorical codes + categories."""
+    columns = []
+    for i, name in enumerate(df.columns):
+        col = df[name]
+        stem = f"{prefix}.{i}"
+        if _is_text(col):
+            cat = pd.Categorical(col.map(str, na_action="ignore"))
+            np.save(os.path.join(path, f"{stem}.codes.npy"), cat.codes)
+            _save_labels(os.path.join(path, f"{stem}.categories.npy"), cat.categories)
+            columns.append({"name": str(name), "file": stem, "kind": "categorical"})
+        else:
+            np.save(os.path.join(path, f"{stem}.npy"), col.to_numpy())
+            columns.append({"name": str(name), "file": stem, "kind": "array"})
+    return {"columns": columns, "rows": int(len(df))}
+
+
+def _write_matrix(path: str, name: str, df: pd.DataFrame, dtype) -> dict:
+    """Store a homogeneous frame as one 2-D .npy plus its row / column labels."""
+    np.save(os.path.join(path, f"{name}.npy"), np.ascontiguousarray(df.to_numpy(dtype=dtype)))
+    _save_labels(os.path.join(path, f"{name}.index.npy"), df.index)
+    _save_labels(os.path.join(path, f"{name}.columns.npy"), df.columns)
+    return {"file": name, "index_name": df.index.name}
+
+
+def _write_version(version: str, raw: pd.DataFrame, rfm: pd.DataFrame) -> None:
+    final_dir = os.path.join(VERSIONS_DIR, version)
+    tmp_dir = os.path.join(VERSIONS_DIR, f".tmp-{version}-{os.getpid()}")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    scaled = pd.DataFrame(
+        StandardScaler().fit_transform(rfm[SCALED_COLS].fillna(0)),
+        columns=SCALED_COLS,
+    )
+    manifest = {
+        "version": version,
+        "raw": _write_frame(tmp_dir, "raw", raw),
+        "rfm": _write_frame(tmp_dir, "rfm", rfm),
+        "scaled": _write_matrix(tmp_dir, "scaled", scaled, np.float64),
+        "basket": _write_matrix(tmp_dir, "basket", encode_basket(raw), bool),
+    }
+    with open(os.path.join(tmp_dir, "manifest.json"), "w") as fh:
+        json.dump(manifest, fh)
+
+    if os.path.exists(final_dir):
+        shutil.rmtree(tmp_dir)
+    else:
+        os.rename(tmp_dir, final_dir)
+
+
+def _set_current(version: str) -> None:
+    tmp = f"{CURRENT_PATH}.{os.getpid()}"
+    with open(tmp, "w") as fh:
+        fh.write(version)
+    os.replace(tmp, CURRENT_PATH)
+
+
+def _prune(keep: list[str]) -> None:
+    # Files already mapped by other workers stay valid after unlink on POSIX.
+    for name in os.listdir(VERSIONS_DIR):
+        if name not in keep and not name.startswith(".tmp-"):
+            shutil.rmtree(os.path.join(VERSIONS_DIR, name), ignore_errors=True)
+
+
+def publish() -> str:
+    """
+    Build and publish a new version from the source caches.
+    Returns the live version; a no-op if the current fingerprint is already live.
+    """
+    with _publish_lock():
+        previous = current_version()
+        if previous == source_fingerprint() and _is_published(previous):
+            return previous
+
+        raw = load_raw()
+        rfm = compute_rfm(raw)
+        # load_raw / compute_rfm may have just written the caches
+        version = source_fingerprint()
+        os.makedirs(VERSIONS_DIR, exist_ok=True)
+        _write_version(version, raw, rfm)
+        _set_current(version)
+        _prune([v for v in (version, previous) if v][:KEEP_VERSIONS])
+        return version
+
+
+def ensure_published() -> Dataset:
+    """Publish once per source fingerprint (other workers wait on the lock), then attach."""
+    publish()
+    return current()
+
+
+# ─────────────────────────────
+# Attaching
+# ─────────────────────────────
+def _load_labels(path: str) -> pd.Index:
+    return pd.Index(np.load(path))
+
+
+def _read_frame(path: str, spec: dict) -> pd.DataFrame:
+    data = {}
+    for col in spec["columns"]:
+        stem = os.path.join(path, col["file"])
+        if col["kind"] == "categorical":
+            codes = np.load(f"{stem}.codes.npy", mmap_mode="r")
+            dtype = pd.CategoricalDtype(_load_labels(f"{stem}.categories.npy"))
+            data[col["name"]] = pd.Categorical.from_codes(codes, dtype=dtype, validate=False)
+        else:
+            data[col["name"]] = np.load(f"{stem}.npy", mmap_mode="r")
+    return pd.DataFrame(data, copy=False)
+
+
+def _read_matrix(path: str, spec: dict) -> pd.DataFrame:
+    stem = os.path.join(path, spec["file"])
+    index = _load_labels(f"{stem}.index.npy")
+    index.name = spec["index_name"]
+    return pd.DataFrame(
+        np.load(f"{stem}.npy", mmap_mode="r"),
+        index=index,
+        columns=_load_labels(f"{stem}.columns.npy"),
+        copy=False,
+    )
+
+
+def attach(version: str) -> Dataset:
+    """Map a published version into this process without copying the arrays."""
+    path = os.path.join(VERSIONS_DIR, version)
+    with open(os.path.join(path, "manifest.json")) as fh:
+        manifest = json.load(fh)
+    return Dataset(
+        version=version,
+        raw=_read_frame(path, manifest["raw"]),
+        rfm=_read_frame(path, manifest["rfm"]),
+        scaled=_read_matrix(path, manifest["scaled"]),
+        basket=_read_matrix(path, manifest["basket"]),
+    )
+
+
+def current() -> Dataset:
+    """
+    The live dataset for this worker. Re-attaches when CURRENT has moved on;
+    callers should grab it once per request so they never mix two versions.
+    """
+    global _attached
+    version = current_version()
+    if version is None:
+        raise RuntimeError("No dataset published yet; call ensure_published() first.")
+    ds = _attached
+    if ds is not None and ds.version == version:
+        return ds
+    with _attach_lock:
+        if _attached is None or _attached.version != version:
+            _attached = attach(version)
+        return _attached
+
+
+if __name__ == "__main__":
+    v = publish()
+    print(f"✅ Published dataset version {v} to {STORE_DIR}")
@@ -0,0 +1,158 @@
+"""
+Conditional GET (ETag / If-None-Match) and response compression for the /api routes.
+
+Results are a pure function of the dataset version and the query parameters (routes
+that also depend on per-worker state opt out via `uncacheable`), so the ETag is
+derived from those alone: a matching If-None-Match is answered with
+304 before the endpoint runs, without recomputing or serialising anything.
+Large 200 responses are compressed with brotli or gzip, whichever the client prefers.
+"""
+import gzip
+import hashlib
+from typing import Callable
+from urllib.parse import parse_qsl
+
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import Response
+
+from data import shared_store
+
+try:
+    import brotli
+except ImportError:  # optional: fall back to gzip only
+    brotli = None
+
+MIN_COMPRESS_SIZE = 1024  # bytes; smaller payloads are not worth the CPU
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5        # fast enough for per-request dynamic content
+
+
+def _normalize_value(value: str) -> str:
+    """Canonical form so that e.g. 0.02 / 0.020 or True / true share one ETag."""
+    lowered = value.strip().lower()
+    if lowered in ("true", "false"):
+        return lowered
+    try:
+        return str(int(lowered))
+    except ValueError:
+        pass
+    try:
+        return repr(float(lowered))
+    except ValueError:
+        return value
+
+
+def normalized_params(query_string: str) -> str:
+    # Sort by key only (stable): repeated keys keep their order, since the last one wins.
+    pairs = sorted(((k, _normalize_value(v)) for k, v in parse_qsl(query_string, keep_blank_values=True)),
+                   key=lambda kv: kv[0])
+    return "&".join(f"{k}={v}" for k, v in pairs)
+
+
+def make_etag(version: str, path: str, query_string: str, salt: str = "") -> str:
+    key = f"{salt}|{version}|{path}|{normalized_params(query_string)}"
+    return hashlib.sha1(key.encode()).hexdigest()[:20]
+
+
+def _quoted(tag: str, encoding: str | None = None) -> str:
+    # Each encoded representation gets its own strong validator.
+    return f'"{tag}-{encoding}"' if encoding else f'"{tag}"'
+
+
+def _matching_tag(if_none_match: str, tag: str) -> str | None:
+    """The client's tag that validates against `tag` (any encoding), if any. Ignores '*'."""
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate in (_quoted(tag), _quoted(tag, "br"), _quoted(tag, "gzip")):
+            return candidate
+    return None
+
+
+def choose_encoding(accept_encoding: str) -> str | None:
+    """Pick br or gzip from an Accept-Encoding header by q-value (br wins ties)."""
+    weights = {}
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[token.strip().lower()] = q
+
+    wildcard = weights.get("*", 0.0)
+    available = ["br", "gzip"] if brotli is not None else ["gzip"]
+    ranked = [(weights.get(enc, wildcard), enc) for enc in available]
+    ranked = [(q, enc) for q, enc in ranked if q > 0]
+    if not ranked:
+        return None
+    return max(ranked, key=lambda qe: (qe[0], qe[1] == "br"))[1]
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+class ConditionalGetMiddleware(BaseHTTPMiddleware):
+    """Strong ETags keyed on dataset version + normalized params, 304s, and br/gzip bodies."""
+
+    def __init__(self, app, prefix: str = "/api", salt: str = "",
+                 uncacheable: Callable[[Request], bool] | None = None):
+        super().__init__(app)
+        self.prefix = prefix
+        self.salt = salt  # must change with any code change that alters response bodies
+        # Requests whose body also depends on per-worker state get no validator.
+        self.uncacheable = uncacheable
+
+    async def dispatch(self, request: Request, call_next):
+        if request.method != "GET" or not request.url.path.startswith(self.prefix):
+            return await call_next(request)
+
+        # Read before the endpoint runs: if a refresh lands mid-request the
+        # response is labelled with the older version and simply refetched later.
+        version = shared_store.current_version()
+        if version is None:
+            return await call_next(request)
+        if self.uncacheable is not None and self.uncacheable(request):
+            response = await call_next(request)
+            if response.status_code != 200:
+                return response
+            return await self._encoded(request, response, {"Vary": "Accept-Encoding"})
+        tag = make_etag(version, request.url.path, request.url.query, self.salt)
+        headers = {"Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+
+        if_none_match = request.headers.get("if-none-match", "")
+        matched = _matching_tag(if_none_match, tag)
+        if matched:
+            return Response(status_code=304, headers={**headers, "ETag": matched})
+
+        response = await call_next(request)
+        if response.status_code != 200:
+            return response
+        # '*' only matches once we know a current representation exists (RFC 9110 13.1.2),
+        # so unknown paths and invalid params still get their 404 / 422.
+        if any(c.strip() == "*" for c in if_none_match.split(",")):
+            return Response(status_code=304, headers={**headers, "ETag": _quoted(tag)})
+        return await self._encoded(request, response, headers, tag)
+
+    async def _encoded(self, request: Request, response, headers: dict, tag: str | None = None) -> Response:
+        """Re-emit a 200 response, compressed if large enough, with `headers` and the ETag."""
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        out_headers = {k: v for k, v in response.headers.items() if k.lower() != "content-length"}
+        encoding = None
+        if len(body) >= MIN_COMPRESS_SIZE and "content-encoding" not in response.headers:
+            encoding = choose_encoding(request.headers.get("accept-encoding", ""))
+        if encoding:
+            body = compress(body, encoding)
+            out_headers["Content-Encoding"] = encoding
+        out_headers.update(headers)
+        if tag is not None:
+            out_headers["ETag"] = _quoted(tag, encoding)
+        return Response(content=body, status_code=200, headers=out_headers, media_type=response.media_type)
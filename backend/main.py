@@ -1,18 +1,39 @@
 """
 FastAPI main application with all ML API routes.
 """
+import os
+import threading
+
 from fastapi import FastAPI, Query
 from fastapi.middleware.cors import CORSMiddleware
-import pandas as pd
 
-from data.loader import load_raw, compute_rfm, get_dataset_stats
+from data import shared_store
+from http_cache import ConditionalGetMiddleware
+from data.loader import get_dataset_stats
 from ml.clustering import run_kmeans, run_hierarchical, run_dbscan
 from ml.dimensionality import run_pca, run_lda
-from ml.market_basket import run_market_basket
+from ml.market_basket import run_market_basket, SlidingWindowMiner
 from ml.personas import generate_personas
 
 app = FastAPI(title="Customer Segmentation API", version="1.0.0")
 
+
+def _is_windowed_basket(request) -> bool:
+    """
+    Windowed rules depend on what this worker's miner has been fed, not just on the
+    dataset version, so they must not share a strong ETag across workers.
+    """
+    return (request.url.path == "/api/market-basket"
+            and request.query_params.get("windowed", "").lower() in ("1", "true", "on", "yes"))
+
+
+# Bump whenever a change alters any /api response body (values, ordering, keys), so
+# clients holding an ETag from the previous deploy refetch instead of getting a 304.
+PAYLOAD_VERSION = 2
+
+# ETag / 304 + br/gzip for /api; added first so CORS headers still wrap its responses
+app.add_middleware(ConditionalGetMiddleware, salt=f"{app.version}+payload{PAYLOAD_VERSION}",
+                   uncacheable=_is_windowed_basket)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -20,18 +41,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Pre-load data at startup to avoid repeated downloads
-_raw_df: pd.DataFrame = None
-_rfm_df: pd.DataFrame = None
-
-
+# Publish the dataset once into shared memory-mapped files; every uvicorn
+# worker attaches to the same copy. Handlers grab shared_store.current() once
+# per request so a refresh never mixes two dataset versions mid-request.
 @app.on_event("startup")
 def startup():
-    global _raw_df, _rfm_df
     print("🔄 Loading dataset...")
-    _raw_df = load_raw()
-    _rfm_df = compute_rfm(_raw_df)
-    print(f"✅ Loaded {len(_raw_df):,} transactions, {len(_rfm_df):,} customers")
+    ds = shared_store.ensure_published()
+    print(f"✅ Attached dataset {ds.version}: {len(ds.raw):,} transactions, {len(ds.rfm):,} customers")
 
 
 # ─────────────────────────────
@@ -39,7 +56,8 @@ def startup():
 # ─────────────────────────────
 @app.get("/api/dataset/stats")
 def dataset_stats():
-    return get_dataset_stats()
+    ds = shared_store.current()
+    return get_dataset_stats(ds.raw, ds.rfm)
 
 
 # ─────────────────────────────
@@ -47,18 +65,21 @@ def dataset_stats():
 # ─────────────────────────────
 @app.get("/api/kmeans")
 def kmeans(k: int = Query(default=4, ge=2, le=10)):
-    return run_kmeans(_rfm_df, k=k)
+    ds = shared_store.current()
+    return run_kmeans(ds.rfm, k=k, scaled=ds.scaled)
 
 
 @app.get("/api/hierarchical")
 def hierarchical(n_clusters: int = Query(default=4, ge=2, le=8)):
-    return run_hierarchical(_rfm_df, n_clusters=n_clusters)
+    ds = shared_store.current()
+    return run_hierarchical(ds.rfm, n_clusters=n_clusters, scaled=ds.scaled)
 
 
 @app.get("/api/dbscan")
 def dbscan(eps: float = Query(default=0.5, ge=0.1, le=5.0),
            min_samples: int = Query(default=5, ge=2, le=20)):
-    return run_dbscan(_rfm_df, eps=eps, min_samples=min_samples)
+    ds = shared_store.current()
+    return run_dbscan(ds.rfm, eps=eps, min_samples=min_samples, scaled=ds.scaled)
 
 
 # ─────────────────────────────
@@ -66,23 +87,59 @@ def dbscan(eps: float = Query(default=0.5, ge=0.1, le=5.0),
 # ─────────────────────────────
 @app.get("/api/pca")
 def pca(n_components: int = Query(default=3, ge=2, le=5)):
-    return run_pca(_rfm_df, n_components=n_components)
+    ds = shared_store.current()
+    return run_pca(ds.rfm, n_components=n_components, scaled=ds.scaled)
 
 
 @app.get("/api/lda")
 def lda(n_components: int = Query(default=2, ge=1, le=3)):
-    return run_lda(_rfm_df, n_components=n_components)
+    ds = shared_store.current()
+    return run_lda(ds.rfm, n_components=n_components, scaled=ds.scaled)
 
 
 # ─────────────────────────────
 # Market Basket
 # ─────────────────────────────
+# Rolling-window rules: fed incrementally as new invoices appear in the dataset
+BASKET_WINDOW_DAYS = int(os.environ.get("BASKET_WINDOW_DAYS", "90"))
+_basket_miner = SlidingWindowMiner(window_days=BASKET_WINDOW_DAYS)
+_basket_miner_lock = threading.Lock()
+_basket_miner_version: str | None = None
+
+
+def _windowed_market_basket(ds: shared_store.Dataset, min_support: float, min_confidence: float) -> dict:
+    """
+    Rolling-window rules from the worker's miner. On a new dataset version the miner
+    is fed only invoices at or after the latest date it has seen (invoices sharing
+    that timestamp are merged, not double-counted). Invoices a refresh removes or
+    corrects are never taken back out; only new invoices are added.
+
+    The miner is shared between threadpool requests, so it is updated and read
+    under one lock: a query never sees half-updated counts.
+    """
+    global _basket_miner_version
+    with _basket_miner_lock:
+        if _basket_miner_version != ds.version:
+            raw = ds.raw
+            since = raw["InvoiceDate"].max() - _basket_miner.window
+            if _basket_miner.latest is not None:
+                since = max(since, _basket_miner.latest)
+            _basket_miner.update(raw[raw["InvoiceDate"] >= since])
+            _basket_miner_version = ds.version
+        return run_market_basket(ds.raw, min_support=min_support, min_confidence=min_confidence,
+                                 miner=_basket_miner)
+
+
 @app.get("/api/market-basket")
 def market_basket(
     min_support: float = Query(default=0.02, ge=0.005, le=0.5),
-    min_confidence: float = Query(default=0.3, ge=0.1, le=1.0)
+    min_confidence: float = Query(default=0.3, ge=0.1, le=1.0),
+    windowed: bool = Query(default=False),
 ):
-    return run_market_basket(_raw_df, min_support=min_support, min_confidence=min_confidence)
+    ds = shared_store.current()
+    if windowed:
+        return _windowed_market_basket(ds, min_support, min_confidence)
+    return run_market_basket(ds.raw, min_support=min_support, min_confidence=min_confidence, basket=ds.basket)
 
 
 # ─────────────────────────────
@@ -90,7 +147,8 @@ def market_basket(
 # ─────────────────────────────
 @app.get("/api/reports")
 def reports(k: int = Query(default=4, ge=2, le=10)):
-    return {"personas": generate_personas(_rfm_df, k=k)}
+    ds = shared_store.current()
+    return {"personas": generate_personas(ds.rfm, k=k, scaled=ds.scaled)}
 
 
 if __name__ == "__main__":
@@ -12,14 +12,16 @@ import json
 FEATURE_COLS = ["log_Recency", "log_Frequency", "log_Monetary", "log_UniqueProducts"]
 
 
-def _scale(rfm: pd.DataFrame):
+def _scale(rfm: pd.DataFrame, scaled: pd.DataFrame | None = None):
+    if scaled is not None:
+        return scaled[FEATURE_COLS].to_numpy()
     scaler = StandardScaler()
     X = scaler.fit_transform(rfm[FEATURE_COLS].fillna(0))
     return X
 
 
-def run_kmeans(rfm: pd.DataFrame, k: int = 4, max_k: int = 10) -> dict:
-    X = _scale(rfm)
+def run_kmeans(rfm: pd.DataFrame, k: int = 4, max_k: int = 10, scaled: pd.DataFrame | None = None) -> dict:
+    X = _scale(rfm, scaled)
 
     # Elbow + Silhouette
     inertias, silhouettes = [], []
@@ -79,8 +81,8 @@ def run_kmeans(rfm: pd.DataFrame, k: int = 4, max_k: int = 10) -> dict:
     }
 
 
-def run_hierarchical(rfm: pd.DataFrame, n_clusters: int = 4, method: str = "ward") -> dict:
-    X = _scale(rfm)
+def run_hierarchical(rfm: pd.DataFrame, n_clusters: int = 4, method: str = "ward", scaled: pd.DataFrame | None = None) -> dict:
+    X = _scale(rfm, scaled)
 
     # Sample for linkage (max 500 for dendrogram performance)
     if X.shape[0] > 500:
@@ -144,8 +146,8 @@ def run_hierarchical(rfm: pd.DataFrame, n_clusters: int = 4, method: str = "ward
     }
 
 
-def run_dbscan(rfm: pd.DataFrame, eps: float = 0.5, min_samples: int = 5) -> dict:
-    X = _scale(rfm)
+def run_dbscan(rfm: pd.DataFrame, eps: float = 0.5, min_samples: int = 5, scaled: pd.DataFrame | None = None) -> dict:
+    X = _scale(rfm, scaled)
     model = DBSCAN(eps=eps, min_samples=min_samples)
     labels = model.fit_predict(X)
 
@@ -11,14 +11,16 @@ from sklearn.cluster import KMeans
 FEATURE_COLS = ["log_Recency", "log_Frequency", "log_Monetary", "log_UniqueProducts", "AvgBasketSize"]
 
 
-def _scale(rfm: pd.DataFrame):
+def _scale(rfm: pd.DataFrame, scaled: pd.DataFrame | None = None):
+    if scaled is not None:
+        return scaled[FEATURE_COLS].to_numpy()
     scaler = StandardScaler()
     X = scaler.fit_transform(rfm[FEATURE_COLS].fillna(0))
     return X
 
 
-def run_pca(rfm: pd.DataFrame, n_components: int = 3) -> dict:
-    X = _scale(rfm)
+def run_pca(rfm: pd.DataFrame, n_components: int = 3, scaled: pd.DataFrame | None = None) -> dict:
+    X = _scale(rfm, scaled)
     pca = PCA(n_components=min(n_components, len(FEATURE_COLS)), random_state=42)
     coords = pca.fit_transform(X)
 
@@ -68,8 +70,8 @@ def run_pca(rfm: pd.DataFrame, n_components: int = 3) -> dict:
     }
 
 
-def run_lda(rfm: pd.DataFrame, n_components: int = 2) -> dict:
-    X = _scale(rfm)
+def run_lda(rfm: pd.DataFrame, n_components: int = 2, scaled: pd.DataFrame | None = None) -> dict:
+    X = _scale(rfm, scaled)
 
     # LDA requires labels — use KMeans
     km = KMeans(n_clusters=4, random_state=42, n_init=10)
@@ -1,6 +1,11 @@
 """
-Market basket analysis using real transaction data and Apriori algorithm (mlxtend).
+Market basket analysis using real transaction data and Apriori algorithm (mlxtend),
+plus an incremental miner that keeps rules current over a sliding window of invoices.
 """
+import heapq
+from collections import Counter
+from itertools import combinations
+
 import pandas as pd
 import numpy as np
 from mlxtend.frequent_patterns import apriori, association_rules
@@ -9,32 +14,279 @@ from mlxtend.preprocessing import TransactionEncoder
 CACHE_PATH = None  # computed each call unless cached at app level
 
 
-def run_market_basket(df: pd.DataFrame, min_support: float = 0.02, min_confidence: float = 0.3) -> dict:
+def _value_counts(col: pd.Series) -> pd.Series:
     """
-    Run Apriori on real invoice data.
-    df: raw Online Retail dataframe
+    Series.value_counts() that breaks ties like an object column (first appearance),
+    so categorical columns from the shared store rank products exactly as plain ones do.
+    """
+    if not isinstance(col.dtype, pd.CategoricalDtype):
+        return col.value_counts()
+    codes = col.array.codes
+    codes = codes[codes >= 0]
+    uniques, first_seen, counts = np.unique(codes, return_index=True, return_counts=True)
+    order = np.argsort(first_seen)
+    index = pd.Index(np.asarray(col.cat.categories)[uniques[order]], name=col.name)
+    return pd.Series(counts[order], index=index, name="count").sort_values(ascending=False)
+
+
+def encode_basket(df: pd.DataFrame, top_n: int = 50) -> pd.DataFrame:
     """
-    # Build basket: one row per invoice, columns = products (bool)
-    # Use top 50 products for tractability
-    top_products = df["Description"].value_counts().head(50).index.tolist()
+    One-hot basket matrix: one row per invoice, one bool column per product.
+    Only the top_n most frequent products are kept for tractability.
+    """
+    top_products = _value_counts(df["Description"]).head(top_n).index.tolist()
     df_top = df[df["Description"].isin(top_products)]
 
     basket = (
-        df_top.groupby(["InvoiceNo", "Description"])["Quantity"]
+        df_top.groupby(["InvoiceNo", "Description"], observed=True)["Quantity"]
         .sum()
         .unstack()
-        .reset_index()
         .fillna(0)
-        .set_index("InvoiceNo")
     )
-    basket = basket.applymap(lambda x: x > 0)
+    return basket.gt(0)
+
+
+class SlidingWindowMiner:
+    """
+    Incremental frequent-itemset / association-rule miner over a rolling time window.
+
+    Keeps, for the invoices inside the window, an inverted index item -> invoices and
+    exact counts of every itemset of up to counted_len items drawn from the tracked
+    items: the top_n products whose window support is at least min_support. Larger
+    frequent itemsets (up to max_len; None = no limit, as in mlxtend) are grown level
+    by level at query time by intersecting the inverted index, starting from the
+    frequent counted_len-itemsets. By the Apriori property every frequent itemset is
+    built from frequent items, so supports and confidences are exact for any query
+    with support >= min_support.
+
+    Counting matches the Apriori path on the same invoices: the top_n products are
+    ranked by line count (ties by first appearance, as value_counts does), and support
+    is relative to the invoices containing at least one of them (encode_basket's rows).
+
+    Adding an invoice only touches the itemsets it contains; expiring one reverses
+    that. When an item enters the tracked set its itemset counts are backfilled from
+    the invoices it appears in, and dropped when it leaves - no full re-mine.
+    The window is anchored on the latest invoice date seen, not the wall clock.
+    """
+
+    def __init__(self, window_days: int = 90, min_support: float = 0.005,
+                 top_n: int = 50, max_len: int | None = None, counted_len: int = 3):
+        self.window = pd.Timedelta(days=window_days)
+        self.min_support = min_support
+        self.top_n = top_n
+        self.max_len = max_len
+        self.counted_len = counted_len if max_len is None else min(counted_len, max_len)
+        self.latest: pd.Timestamp | None = None
+        self._baskets: dict = {}           # invoice -> frozenset of items
+        self._lines: dict = {}             # invoice -> Counter of lines per item
+        self._item_lines: dict = {}        # item -> window line count, in first-seen order
+        self._n_rows = 0                   # invoices containing a top_n product
+        self._dates: dict = {}             # invoice -> invoice date
+        self._expiry: list = []            # heap of (date, invoice); stale entries skipped
+        self._invoices_by_item: dict = {}  # item -> set of invoices
+        self._tracked: set = set()
+        self._counts: dict = {}            # frozenset (2..counted_len tracked items) -> count
+
+    def __len__(self) -> int:
+        return len(self._baskets)
+
+    def __contains__(self, invoice) -> bool:
+        return invoice in self._baskets
+
+    # ── window maintenance ──
+    def update(self, df: pd.DataFrame) -> None:
+        """
+        Add the invoices in df (InvoiceNo, Description, InvoiceDate rows), then expire old ones.
+        Lines of an invoice already in the window are merged into it; nothing is ever
+        removed except by expiry.
+        """
+        if not df.empty:
+            for item in pd.unique(df["Description"].dropna().map(str)):
+                self._item_lines.setdefault(item, 0)
+            grouped = df.groupby("InvoiceNo", observed=True, sort=False)
+            dates = grouped["InvoiceDate"].max()
+            lines = grouped["Description"].agg(lambda s: Counter(map(str, s.dropna())))
+            for invoice, counter in lines.items():
+                # Lines of an invoice may arrive in separate batches: merge them.
+                date = dates[invoice]
+                if invoice in self._baskets:
+                    counter = counter + self._lines[invoice]
+                    date = max(date, self._dates[invoice])
+                    self._remove(invoice)
+                self._add(invoice, counter, date)
+        self.expire()
+
+    def expire(self, now: pd.Timestamp | None = None) -> None:
+        """Drop invoices older than the window, measured back from `now` (default: latest date seen)."""
+        if now is not None:
+            self.latest = max(self.latest, now) if self.latest is not None else now
+        if self.latest is not None:
+            cutoff = self.latest - self.window
+            while self._expiry and self._expiry[0][0] <= cutoff:
+                date, invoice = heapq.heappop(self._expiry)
+                if self._dates.get(invoice) == date:
+                    self._remove(invoice)
+        self._rebalance()
+
+    def _add(self, invoice, lines: Counter, date: pd.Timestamp) -> None:
+        basket = frozenset(lines)
+        self._baskets[invoice] = basket
+        self._lines[invoice] = lines
+        self._dates[invoice] = date
+        heapq.heappush(self._expiry, (date, invoice))
+        self.latest = max(self.latest, date) if self.latest is not None else date
+        for item in basket:
+            self._invoices_by_item.setdefault(item, set()).add(invoice)
+            self._item_lines[item] = self._item_lines.get(item, 0) + lines[item]
+        for itemset in self._tracked_itemsets(basket):
+            self._counts[itemset] = self._counts.get(itemset, 0) + 1
+
+    def _remove(self, invoice) -> None:
+        basket = self._baskets.pop(invoice)
+        lines = self._lines.pop(invoice)
+        del self._dates[invoice]
+        for item in basket:
+            invoices = self._invoices_by_item[item]
+            invoices.discard(invoice)
+            if not invoices:
+                del self._invoices_by_item[item]
+                del self._item_lines[item]
+            else:
+                self._item_lines[item] -= lines[item]
+        for itemset in self._tracked_itemsets(basket):
+            n = self._counts[itemset] - 1
+            if n:
+                self._counts[itemset] = n
+            else:
+                del self._counts[itemset]
 
-    # Apriori
-    frequent_items = apriori(basket, min_support=min_support, use_colnames=True)
-    if frequent_items.empty:
-        frequent_items = apriori(basket, min_support=0.01, use_colnames=True)
+    def _tracked_itemsets(self, basket: frozenset):
+        items = sorted(basket & self._tracked)
+        for r in range(2, self.counted_len + 1):
+            for combo in combinations(items, r):
+                yield frozenset(combo)
 
-    rules = association_rules(frequent_items, metric="confidence", min_threshold=min_confidence)
+    def _rebalance(self) -> None:
+        """Re-derive the tracked items for the current window and patch the counts."""
+        ranked = self.item_counts().head(self.top_n).index
+        self._n_rows = len(set().union(*(self._invoices_by_item[item] for item in ranked)))
+        threshold = self.min_support * self._n_rows
+        wanted = {item for item in ranked if len(self._invoices_by_item[item]) >= threshold}
+
+        dropped = self._tracked - wanted
+        if dropped:
+            self._tracked -= dropped
+            self._counts = {s: n for s, n in self._counts.items() if not (s & dropped)}
+
+        # Backfill one item at a time so each itemset is counted exactly once,
+        # when the last of its members joins the tracked set.
+        for item in sorted(wanted - self._tracked):
+            for invoice in self._invoices_by_item[item]:
+                others = sorted((self._baskets[invoice] & self._tracked) - {item})
+                for r in range(1, self.counted_len):
+                    for combo in combinations(others, r):
+                        itemset = frozenset(combo) | {item}
+                        self._counts[itemset] = self._counts.get(itemset, 0) + 1
+            self._tracked.add(item)
+
+    # ── queries ──
+    def item_counts(self) -> pd.Series:
+        """Window line count per item, most frequent first (same order as value_counts)."""
+        counts = pd.Series(self._item_lines, dtype=int, name="count")
+        return counts.sort_values(ascending=False)
+
+    def cooccurrence(self, items: list) -> pd.DataFrame:
+        """Invoice co-occurrence counts for the given items (diagonal zeroed)."""
+        empty = set()
+        sets = [self._invoices_by_item.get(item, empty) for item in items]
+        values = [[len(a & b) if i != j else 0 for j, b in enumerate(sets)] for i, a in enumerate(sets)]
+        return pd.DataFrame(values, index=items, columns=items)
+
+    def frequent_itemsets(self, min_support: float | None = None) -> pd.DataFrame:
+        """Frequent itemsets in mlxtend's layout (support, itemsets)."""
+        support = self._supports(min_support)
+        return pd.DataFrame({"support": list(support.values()), "itemsets": list(support.keys())})
+
+    def association_rules(self, min_support: float | None = None, min_confidence: float = 0.3) -> pd.DataFrame:
+        """Rules in mlxtend's layout (antecedents, consequents, support, confidence, lift)."""
+        support = self._supports(min_support)
+        rows = []
+        for itemset, s in support.items():
+            for r in range(1, len(itemset)):
+                for combo in combinations(sorted(itemset), r):
+                    antecedent = frozenset(combo)
+                    consequent = itemset - antecedent
+                    confidence = s / support[antecedent]
+                    if confidence >= min_confidence:
+                        rows.append({
+                            "antecedents": antecedent,
+                            "consequents": consequent,
+                            "support": s,
+                            "confidence": confidence,
+                            "lift": confidence / support[consequent],
+                        })
+        return pd.DataFrame(rows, columns=["antecedents", "consequents", "support", "confidence", "lift"])
+
+    def _supports(self, min_support: float | None) -> dict:
+        # Supports below the miner's own floor are not tracked; clamp to it.
+        n = self._n_rows
+        if not n:
+            return {}
+        threshold = max(min_support or 0.0, self.min_support) * n
+        support = {
+            frozenset([item]): len(self._invoices_by_item[item]) / n
+            for item in self._tracked if len(self._invoices_by_item[item]) >= threshold
+        }
+        support.update({s: c / n for s, c in self._counts.items() if c >= threshold})
+
+        # Grow itemsets beyond counted_len level by level: join frequent k-itemsets
+        # sharing a (k-1)-prefix, keep candidates whose k-subsets are all frequent,
+        # and count them by intersecting their items' invoice sets.
+        level = sorted(tuple(sorted(s)) for s in support if len(s) == self.counted_len)
+        k = self.counted_len
+        while level and (self.max_len is None or k < self.max_len):
+            next_level = []
+            for i, a in enumerate(level):
+                for b in level[i + 1:]:
+                    if a[:-1] != b[:-1]:
+                        break
+                    candidate = frozenset(a + b[-1:])
+                    if not all(candidate - {x} in support for x in candidate):
+                        continue
+                    count = len(set.intersection(*(self._invoices_by_item[x] for x in candidate)))
+                    if count >= threshold:
+                        support[candidate] = count / n
+                        next_level.append(a + b[-1:])
+            level = sorted(next_level)
+            k += 1
+        return support
+
+
+def run_market_basket(df: pd.DataFrame, min_support: float = 0.02, min_confidence: float = 0.3,
+                      basket: pd.DataFrame | None = None, miner: SlidingWindowMiner | None = None) -> dict:
+    """
+    Run Apriori on real invoice data.
+    df: raw Online Retail dataframe
+    basket: pre-encoded basket matrix (see encode_basket), built from df if omitted
+    miner: sliding-window miner; if given, rules, heatmap and item counts come from
+           its current window instead of re-mining the full history
+    """
+    if miner is not None:
+        frequent_items = miner.frequent_itemsets(min_support)
+        if frequent_items.empty:
+            min_support = 0.01
+            frequent_items = miner.frequent_itemsets(min_support)
+        rules = miner.association_rules(min_support, min_confidence)
+    else:
+        if basket is None:
+            basket = encode_basket(df)
+
+        # Apriori
+        frequent_items = apriori(basket, min_support=min_support, use_colnames=True)
+        if frequent_items.empty:
+            frequent_items = apriori(basket, min_support=0.01, use_colnames=True)
+
+        rules = association_rules(frequent_items, metric="confidence", min_threshold=min_confidence)
     rules = rules.sort_values("lift", ascending=False)
 
     top_rules = []
@@ -48,18 +300,24 @@ def run_market_basket(df: pd.DataFrame, min_support: float = 0.02, min_confidenc
         })
 
     # Co-occurrence matrix (top 20 products)
-    top20 = df["Description"].value_counts().head(20).index.tolist()
-    df20 = df[df["Description"].isin(top20)]
-    b20 = (
-        df20.groupby(["InvoiceNo", "Description"])["Quantity"]
-        .sum()
-        .unstack()
-        .fillna(0)
-        .applymap(lambda x: x > 0)
-        .astype(int)
-    )
-    cooc = b20.T.dot(b20)
-    np.fill_diagonal(cooc.values, 0)
+    if miner is not None:
+        item_counts = miner.item_counts()
+        # Sorted like the unstacked basket columns on the Apriori path
+        cooc = miner.cooccurrence(sorted(item_counts.head(20).index))
+    else:
+        item_counts = _value_counts(df["Description"])
+        top20 = item_counts.head(20).index.tolist()
+        df20 = df[df["Description"].isin(top20)]
+        b20 = (
+            df20.groupby(["InvoiceNo", "Description"], observed=True)["Quantity"]
+            .sum()
+            .unstack()
+            .fillna(0)
+            .gt(0)
+            .astype(int)
+        )
+        cooc = b20.T.dot(b20)
+        np.fill_diagonal(cooc.values, 0)
 
     heatmap = []
     for r in cooc.index:
@@ -67,7 +325,7 @@ def run_market_basket(df: pd.DataFrame, min_support: float = 0.02, min_confidenc
             heatmap.append({"row": str(r)[:25], "col": str(c)[:25], "value": int(cooc.loc[r, c])})
 
     # Item frequency
-    item_freq = df["Description"].value_counts().head(20)
+    item_freq = item_counts.head(20)
     item_freq_list = [{"item": str(k)[:25], "count": int(v)} for k, v in item_freq.items()]
 
     return {
@@ -73,9 +73,11 @@ PERSONA_META = {
 }
 
 
-def generate_personas(rfm: pd.DataFrame, k: int = 4) -> list:
-    scaler = StandardScaler()
-    X = scaler.fit_transform(rfm[FEATURE_COLS].fillna(0))
+def generate_personas(rfm: pd.DataFrame, k: int = 4, scaled: pd.DataFrame | None = None) -> list:
+    if scaled is not None:
+        X = scaled[FEATURE_COLS].to_numpy()
+    else:
+        X = StandardScaler().fit_transform(rfm[FEATURE_COLS].fillna(0))
     km = KMeans(n_clusters=k, random_state=42, n_init=10)
     labels = km.fit_predict(X)
     rfm = rfm.copy()
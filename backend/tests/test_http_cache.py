@@ -0,0 +1,65 @@
+"""
+Tests for the ETag / conditional GET middleware.
+"""
+import pytest
+from fastapi import FastAPI, Query
+from fastapi.testclient import TestClient
+
+import http_cache
+from http_cache import ConditionalGetMiddleware
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(http_cache.shared_store, "current_version", lambda: "v1")
+    app = FastAPI()
+    app.add_middleware(ConditionalGetMiddleware,
+                       uncacheable=lambda request: request.query_params.get("live") == "true")
+    calls = []
+
+    @app.get("/api/items")
+    def items(k: int = Query(default=4, ge=2, le=10), live: bool = False):
+        calls.append(k)
+        return {"k": k, "values": list(range(500))}
+
+    c = TestClient(app)
+    c.calls = calls
+    return c
+
+
+def test_matching_etag_returns_304_without_running_endpoint(client):
+    first = client.get("/api/items?k=3", headers={"Accept-Encoding": "gzip"})
+    assert first.status_code == 200
+    assert first.headers["content-encoding"] == "gzip"
+
+    again = client.get("/api/items?k=03", headers={"If-None-Match": first.headers["etag"]})
+    assert again.status_code == 304
+    assert client.calls == [3]
+
+
+def test_wildcard_only_matches_existing_representations(client):
+    assert client.get("/api/nope", headers={"If-None-Match": "*"}).status_code == 404
+    assert client.get("/api/items?k=99", headers={"If-None-Match": "*"}).status_code == 422
+    assert client.get("/api/items?k=3", headers={"If-None-Match": "*"}).status_code == 304
+
+
+def test_salt_changes_the_etag():
+    assert http_cache.make_etag("v1", "/api/items", "k=3", salt="1.0.0+payload1") != \
+        http_cache.make_etag("v1", "/api/items", "k=3", salt="1.0.0+payload2")
+
+
+def test_uncacheable_requests_get_no_validator(client):
+    first = client.get("/api/items?k=3&live=true", headers={"Accept-Encoding": "gzip"})
+    assert first.status_code == 200
+    assert "etag" not in first.headers
+    assert first.headers["content-encoding"] == "gzip"
+
+    tag = client.get("/api/items?k=3").headers["etag"]
+    assert client.get("/api/items?k=3&live=true", headers={"If-None-Match": "*"}).status_code == 200
+    assert client.get("/api/items?k=3&live=true", headers={"If-None-Match": tag}).status_code == 200
+    assert client.calls == [3, 3, 3, 3]
+
+
+def test_repeated_keys_keep_their_order():
+    assert http_cache.normalized_params("k=3&b=1&k=4") == "b=1&k=3&k=4"
+    assert http_cache.make_etag("v1", "/api/items", "k=3&k=4") != http_cache.make_etag("v1", "/api/items", "k=4&k=3")
@@ -0,0 +1,150 @@
+"""
+Tests for the sliding-window miner and the /api/market-basket windowed path.
+"""
+import threading
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from mlxtend.frequent_patterns import apriori
+
+import main
+from ml.market_basket import SlidingWindowMiner, encode_basket, run_market_basket
+
+
+def _transactions(n_invoices: int = 1500, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    products = [f"ITEM {i}" for i in range(60)]
+    weights = np.linspace(3, 0.1, len(products))
+    weights /= weights.sum()
+    rows = []
+    for invoice in range(n_invoices):
+        date = pd.Timestamp("2011-01-01") + pd.Timedelta(hours=2 * invoice)
+        for item in rng.choice(products, size=rng.integers(2, 8), p=weights):
+            rows.append({"InvoiceNo": str(500000 + invoice), "Description": item,
+                         "InvoiceDate": date, "Quantity": 1})
+    return pd.DataFrame(rows)
+
+
+def _rule_set(miner: SlidingWindowMiner) -> set:
+    rules = miner.association_rules(0.01, 0.1)
+    return {
+        (row.antecedents, row.consequents, round(row.support, 9), round(row.confidence, 9))
+        for row in rules.itertuples(index=False)
+    }
+
+
+@pytest.fixture
+def fresh_miner(monkeypatch):
+    miner = SlidingWindowMiner(window_days=30, min_support=0.01, top_n=30)
+    monkeypatch.setattr(main, "_basket_miner", miner)
+    monkeypatch.setattr(main, "_basket_miner_version", None)
+    return miner
+
+
+def test_incremental_updates_match_a_fresh_build():
+    df = _transactions()
+    incremental = SlidingWindowMiner(window_days=30, min_support=0.01, top_n=30)
+    for chunk in np.array_split(df, 20):
+        incremental.update(chunk)
+
+    cutoff = df["InvoiceDate"].max() - pd.Timedelta(days=30)
+    fresh = SlidingWindowMiner(window_days=30, min_support=0.01, top_n=30)
+    fresh.update(df[df["InvoiceDate"] > cutoff])
+
+    assert len(incremental) == len(fresh)
+    assert _rule_set(incremental) == _rule_set(fresh)
+
+
+def test_refresh_keeps_invoices_sharing_the_latest_timestamp(fresh_miner):
+    df = _transactions(n_invoices=200)
+    latest = df["InvoiceDate"].max()
+    main._windowed_market_basket(SimpleNamespace(version="v1", raw=df), 0.01, 0.1)
+
+    late = pd.DataFrame([{"InvoiceNo": "999999", "Description": "ITEM 0",
+                          "InvoiceDate": latest, "Quantity": 1}])
+    refreshed = pd.concat([df, late], ignore_index=True)
+    main._windowed_market_basket(SimpleNamespace(version="v2", raw=refreshed), 0.01, 0.1)
+
+    assert "999999" in fresh_miner
+
+
+def test_concurrent_requests_during_refresh(fresh_miner):
+    df = _transactions()
+    dates = df["InvoiceDate"].sort_values().unique()
+    versions = [
+        SimpleNamespace(version=f"v{i}", raw=df[df["InvoiceDate"] <= dates[end - 1]])
+        for i, end in enumerate(np.linspace(len(dates) // 2, len(dates), 30, dtype=int))
+    ]
+    errors, position = [], {"i": 0}
+    lock = threading.Lock()
+
+    def worker():
+        try:
+            for _ in range(15):
+                with lock:
+                    ds = versions[min(position["i"], len(versions) - 1)]
+                    position["i"] += 1
+                result = main._windowed_market_basket(ds, 0.01, 0.1)
+                assert len(result["heatmap"]) == 400
+        except Exception as exc:  # surfaced in the main thread below
+            errors.append(exc)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert not errors, errors
+
+
+def test_itemsets_larger_than_counted_len_are_found():
+    rng = np.random.default_rng(5)
+    rows = []
+    for invoice in range(400):
+        items = set(rng.choice([f"ITEM {i}" for i in range(10, 30)], size=3))
+        if invoice % 4 == 0:
+            items |= {"ITEM 1", "ITEM 2", "ITEM 3", "ITEM 4", "ITEM 5"}
+        for item in items:
+            rows.append({"InvoiceNo": str(invoice), "Description": item,
+                         "InvoiceDate": pd.Timestamp("2011-01-01"), "Quantity": 1})
+    df = pd.DataFrame(rows)
+    miner = SlidingWindowMiner(window_days=30, min_support=0.01, top_n=50)
+    miner.update(df)
+
+    itemsets = miner.frequent_itemsets(0.1)["itemsets"]
+    assert frozenset({"ITEM 1", "ITEM 2", "ITEM 3", "ITEM 4", "ITEM 5"}) in set(itemsets)
+    basket = encode_basket(df)
+    expected = apriori(basket, min_support=0.1, use_colnames=True)
+    assert set(itemsets) == set(expected["itemsets"])
+
+
+def test_full_window_payload_matches_apriori_path():
+    df = _transactions(n_invoices=800, seed=2)
+    # Invoices that hold no top-50 product must not count towards support.
+    df = pd.concat([df, pd.DataFrame([
+        {"InvoiceNo": f"X{i}", "Description": f"RARE {i}",
+         "InvoiceDate": pd.Timestamp("2011-01-02"), "Quantity": 1} for i in range(150)
+    ])], ignore_index=True).sort_values("InvoiceDate", kind="stable", ignore_index=True)
+    miner = SlidingWindowMiner(window_days=365)
+    miner.update(df)
+
+    windowed = run_market_basket(df, 0.02, 0.2, miner=miner)
+    full = run_market_basket(df, 0.02, 0.2)
+
+    for key in ("heatmap", "item_frequency", "total_rules", "total_frequent_itemsets"):
+        assert windowed[key] == full[key], key
+    # Symmetric rules tie on lift, so compare the ranked rules without their tie order.
+    by_lift = lambda rules: sorted(rules, key=lambda r: (-r["lift"], r["antecedents"], r["consequents"]))
+    assert by_lift(windowed["top_rules"]) == by_lift(full["top_rules"])
+
+
+def test_empty_result_falls_back_to_one_percent_support():
+    miner = SlidingWindowMiner(window_days=365)
+    df = _transactions(n_invoices=300, seed=4)
+    miner.update(df)
+    assert (run_market_basket(df, 0.5, 0.1, miner=miner)["total_frequent_itemsets"]
+            == run_market_basket(df, 0.5, 0.1)["total_frequent_itemsets"] > 0)
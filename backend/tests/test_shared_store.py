@@ -0,0 +1,107 @@
+"""
+Tests for the shared, memory-mapped dataset store.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.preprocessing import StandardScaler
+
+import data.loader as loader
+from data import shared_store
+from ml.market_basket import _value_counts, encode_basket
+
+
+def _raw(n: int = 3000, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "InvoiceNo": [f"5{i:05d}" for i in rng.integers(0, 400, n)],
+        "StockCode": [f"S{i}" for i in rng.integers(0, 70, n)],
+        "Description": [f"PRODUCT {i}" for i in rng.integers(0, 70, n)],
+        "Quantity": rng.integers(1, 10, n),
+        "InvoiceDate": pd.Timestamp("2010-12-01") + pd.to_timedelta(rng.integers(0, 300 * 24, n), unit="h"),
+        "UnitPrice": rng.uniform(0.5, 10, n).round(2),
+        "CustomerID": rng.integers(12000, 12200, n),
+        "Country": rng.choice(["United Kingdom", "France", "Germany"], n),
+    })
+    df["TotalPrice"] = df["Quantity"] * df["UnitPrice"]
+    return df
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    """A store under a temporary DATASET_STORE_DIR, fed from temporary source caches."""
+    store_dir = tmp_path / "shared"
+    monkeypatch.setenv("DATASET_STORE_DIR", str(store_dir))
+    monkeypatch.setattr(shared_store, "STORE_DIR", str(store_dir))
+    monkeypatch.setattr(shared_store, "VERSIONS_DIR", str(store_dir / "versions"))
+    monkeypatch.setattr(shared_store, "CURRENT_PATH", str(store_dir / "CURRENT"))
+    monkeypatch.setattr(shared_store, "LOCK_PATH", str(store_dir / ".lock"))
+    monkeypatch.setattr(shared_store, "_attached", None)
+    for module in (loader, shared_store):
+        monkeypatch.setattr(module, "CACHE_PATH", str(tmp_path / "online_retail_clean.csv"))
+        monkeypatch.setattr(module, "RFM_CACHE_PATH", str(tmp_path / "rfm_features.csv"))
+    _raw().to_csv(loader.CACHE_PATH, index=False)
+    return shared_store
+
+
+def _touch(path: str, seconds: int) -> None:
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + seconds * 10**9))
+
+
+def _as_plain(df: pd.DataFrame) -> pd.DataFrame:
+    return df.astype({c: object for c in df.columns if isinstance(df[c].dtype, pd.CategoricalDtype)})
+
+
+def test_attached_frames_match_the_source(store):
+    ds = store.ensure_published()
+    raw = loader.load_raw()
+    rfm = loader.compute_rfm(raw)
+
+    pd.testing.assert_frame_equal(_as_plain(ds.raw), raw, check_dtype=False)
+    pd.testing.assert_frame_equal(_as_plain(ds.rfm), rfm, check_dtype=False)
+    assert isinstance(ds.raw["Description"].dtype, pd.CategoricalDtype)
+    assert isinstance(ds.raw._mgr.arrays[ds.raw.columns.get_loc("Quantity")], np.memmap)
+
+    expected = StandardScaler().fit_transform(rfm[store.SCALED_COLS].fillna(0))
+    np.testing.assert_allclose(ds.scaled.to_numpy(), expected)
+    basket = encode_basket(raw)
+    assert ds.basket.columns.tolist() == basket.columns.astype(str).tolist()
+    np.testing.assert_array_equal(ds.basket.to_numpy(), basket.to_numpy())
+
+
+def test_republish_switches_current_and_prunes(store):
+    first = store.ensure_published()
+    assert store.publish() == first.version  # unchanged sources: no-op
+
+    _touch(loader.CACHE_PATH, 1)
+    second = store.publish()
+    assert second != first.version
+    assert store.current().version == second
+    assert first.raw["Quantity"].sum() == store.current().raw["Quantity"].sum()
+
+    _touch(loader.CACHE_PATH, 2)
+    third = store.publish()
+    assert sorted(os.listdir(store.VERSIONS_DIR)) == sorted([second, third])
+
+
+def test_format_version_is_part_of_the_fingerprint(store, monkeypatch):
+    before = store.source_fingerprint()
+    monkeypatch.setattr(store, "STORE_FORMAT_VERSION", store.STORE_FORMAT_VERSION + 1)
+    assert store.source_fingerprint() != before
+
+
+def test_categorical_ties_rank_like_object_columns():
+    rng = np.random.default_rng(7)
+    # Few draws over many products: lots of tied counts.
+    plain = pd.Series([f"PRODUCT {i}" for i in rng.integers(0, 200, 600)], name="Description")
+    categorical = plain.astype("category")
+
+    expected = plain.value_counts()
+    ranked = _value_counts(categorical)
+    assert ranked.index.tolist() == expected.index.tolist()
+    assert ranked.tolist() == expected.tolist()
+    assert (encode_basket(pd.DataFrame({"InvoiceNo": 1, "Description": categorical, "Quantity": 1})).columns.tolist()
+            == encode_basket(pd.DataFrame({"InvoiceNo": 1, "Description": plain, "Quantity": 1})).columns.tolist())